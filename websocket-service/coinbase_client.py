@@ -5,101 +5,204 @@ Uses the same authentication as trading_manager.py
 """
 import os
 import time
+import base64
+import secrets
 import logging
-import jwt
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Optional
-from cryptography.hazmat.primitives import serialization
-from datetime import datetime
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
 
 logger = logging.getLogger(__name__)
 
+JWT_LIFETIME = 120      # Seconds a Coinbase JWT stays valid
+JWT_REUSE_MARGIN = 15   # Re-sign once a cached token has less than this left
+JWT_CACHE_MAX = 256     # Cap on cached GET tokens (paths embed product/order ids)
+JWT_ISSUER = 'coinbase-cloud'
+
+_ES256 = ec.ECDSA(hashes.SHA256())
+
+
+def _b64url(data: bytes) -> bytes:
+    """Unpadded base64url, as JWS requires"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
 
 class CoinbaseClient:
     """Simple Coinbase Advanced Trade API client"""
 
     def __init__(self):
         self.api_key = os.getenv('COINBASE_API_KEY')
-        self.signing_key = os.getenv('COINBASE_SIGNING_KEY')
+        signing_key = os.getenv('COINBASE_SIGNING_KEY')
 
-        if not self.api_key or not self.signing_key:
+        if not self.api_key or not signing_key:
             raise ValueError('COINBASE_API_KEY and COINBASE_SIGNING_KEY must be set')
 
-        # Replace escaped newlines
-        self.signing_key = self.signing_key.replace('\\n', '\n')
+        # Replace escaped newlines, then parse the PEM once - the key never changes,
+        # and ASN.1 decoding it per request cost more than the ES256 signature itself
+        try:
+            self._private_key = serialization.load_pem_private_key(
+                signing_key.replace('\\n', '\n').encode(),
+                password=None
+            )
+        except Exception as e:
+            raise ValueError(f'Invalid COINBASE_SIGNING_KEY: {e}')
+
         self.base_url = "https://api.coinbase.com"
 
+        # Persistent session - reuses pooled keep-alive connections instead of a
+        # fresh TCP+TLS handshake per call. Retries only cover idempotent methods
+        # (urllib3 default), so orders are never re-submitted.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=0.5,
+                              status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+        )
+        self._session.mount('https://', adapter)
+        self._session.headers['Content-Type'] = 'application/json'
+
+        # JWT fields that never change for this key; _generate_jwt only adds
+        # the per-token nonce, times and uri
+        self._jwt_header_base = {'alg': 'ES256', 'typ': 'JWT', 'kid': self.api_key}
+
+        # GET path -> (token, expiry); see _make_request
+        self._jwt_cache: Dict[str, tuple] = {}
+
+        # Short-lived read caches: key -> (value, monotonic expiry). A TTL of 0
+        # disables that cache. Balances are also dropped on every order (POST).
+        self.price_ttl = 0.5
+        self.balance_ttl = 2.0
+        self.product_ttl = 3600.0  # Increments/size limits change very rarely
+        self._price_cache: Dict[str, tuple] = {}
+        self._balance_cache: Dict[str, tuple] = {}
+        self._product_cache: Dict[str, tuple] = {}
+
+        # Currency -> account uuid, learned from the first full /accounts listing
+        self._account_ids: Dict[str, str] = {}
+
         logger.info("Coinbase API client initialized")
 
     def _generate_jwt(self, method: str, path: str) -> str:
-        """Generate JWT token for authentication"""
-        try:
-            # Load private key
-            private_key = serialization.load_pem_private_key(
-                self.signing_key.encode(),
-                password=None
-            )
+        """
+        Generate JWT token for authentication
 
+        Signs the ES256 JWS directly with the cached key rather than through PyJWT,
+        which rebuilt its header/algorithm machinery on every call. Output is a
+        standard compact JWS (header.payload.signature, raw r||s signature).
+        """
+        try:
             # Create JWT URI (method + host + path)
             uri = f"{method} api.coinbase.com{path}"
 
-            # Create JWT payload
+            # Create JWT header and payload
             current_time = int(time.time())
+            header = {
+                **self._jwt_header_base,
+                'nonce': secrets.token_hex()  # Unique per token, even within one second
+            }
             payload = {
                 'sub': self.api_key,
-                'iss': 'coinbase-cloud',
+                'iss': JWT_ISSUER,
                 'nbf': current_time,
-                'exp': current_time + 120,
+                'exp': current_time + JWT_LIFETIME,
                 'uri': uri
             }
 
-            # Generate JWT token
-            token = jwt.encode(
-                payload,
-                private_key,
-                algorithm='ES256',
-                headers={'kid': self.api_key, 'nonce': str(current_time)}
-            )
+            # Sign header.payload; ES256 wants the raw 32-byte r and s, not DER
+            signing_input = _b64url(orjson.dumps(header)) + b'.' + _b64url(orjson.dumps(payload))
+            r, s = decode_dss_signature(self._private_key.sign(signing_input, _ES256))
+            signature = r.to_bytes(32, 'big') + s.to_bytes(32, 'big')
 
-            return token
+            return (signing_input + b'.' + _b64url(signature)).decode('ascii')
 
         except Exception as e:
             raise Exception(f"Failed to generate JWT: {e}")
 
-    def _make_request(self, method: str, path: str, json_data: Optional[Dict] = None) -> Dict:
-        """Make authenticated request to Coinbase API"""
-        token = self._generate_jwt(method, path)
+    def _make_request(self, method: str, path: str, json_data: Optional[Dict] = None,
+                      params: Optional[Dict] = None) -> Dict:
+        """
+        Make authenticated request to Coinbase API
 
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        Query parameters go in params, not path - the JWT uri must not include them.
+        """
+        if method == 'GET':
+            # Reads reuse a token for the same path while it has comfortable validity
+            # left, instead of an ECDSA sign per poll. Orders (POST) always get a
+            # freshly signed token.
+            cached = self._jwt_cache.get(path)
+            if cached and cached[1] - time.time() > JWT_REUSE_MARGIN:
+                token = cached[0]
+            else:
+                token = self._generate_jwt(method, path)
+                if len(self._jwt_cache) >= JWT_CACHE_MAX:
+                    self._jwt_cache.pop(next(iter(self._jwt_cache)))  # Evict oldest
+                self._jwt_cache[path] = (token, time.time() + JWT_LIFETIME)
+        else:
+            token = self._generate_jwt(method, path)
+            self._balance_cache.clear()  # An order is about to move balances
+
+        # Content-Type is a session default; only the per-request token varies
+        headers = {'Authorization': f'Bearer {token}'}
 
         url = f"{self.base_url}{path}"
 
         try:
             if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=10)
+                response = self._session.get(url, headers=headers, params=params, timeout=10)
             elif method == 'POST':
-                response = requests.post(url, headers=headers, json=json_data, timeout=10)
+                # Serialize with orjson; the session already sends Content-Type: application/json
+                response = self._session.post(url, headers=headers, data=orjson.dumps(json_data), timeout=10)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             else:
                 error_msg = f"API request failed ({response.status_code}): {response.text}"
                 logger.error(error_msg)
                 return {'error': error_msg, 'status_code': response.status_code}
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             logger.error(f"Request exception: {e}")
             return {'error': str(e)}
 
+    def auth_headers(self, method: str, path: str) -> Dict[str, str]:
+        """Headers for a request made outside this client's session (e.g. via aiohttp)"""
+        return {
+            'Authorization': f'Bearer {self._generate_jwt(method, path)}',
+            'Content-Type': 'application/json'
+        }
+
+    def close(self):
+        """Close the pooled HTTP connections"""
+        self._session.close()
+
     def get_account_balance(self, currency: str = "USD") -> Optional[float]:
-        """Get account balance for a currency"""
+        """Get account balance for a currency (cached for balance_ttl seconds)"""
+        cached = self._balance_cache.get(currency)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
+
         try:
-            response = self._make_request('GET', '/api/v3/brokerage/accounts')
+            # Known account: fetch just that one instead of listing every account
+            account_id = self._account_ids.get(currency)
+            if account_id:
+                response = self._make_request('GET', f'/api/v3/brokerage/accounts/{account_id}')
+                if 'error' not in response:
+                    balance_value = float(response.get('account', {}).get('available_balance', {}).get('value', 0))
+                    if self.balance_ttl > 0:
+                        self._balance_cache[currency] = (balance_value, time.monotonic() + self.balance_ttl)
+                    return balance_value
+                # Stale uuid or transient failure - fall back to the full listing
+                self._account_ids.pop(currency, None)
+
+            response = self._make_request('GET', '/api/v3/brokerage/accounts', params={'limit': 250})
 
             if 'error' in response:
                 logger.error(f"Error fetching balance: {response['error']}")
@@ -112,6 +215,8 @@ class CoinbaseClient:
             accounts_with_balance = []
             for account in accounts:
                 currency_code = account.get('currency')
+                if account.get('uuid'):
+                    self._account_ids[currency_code] = account['uuid']
                 available_balance = account.get('available_balance', {})
                 balance_value = float(available_balance.get('value', 0))
 
@@ -121,6 +226,8 @@ class CoinbaseClient:
 
                 if currency_code == currency:
                     logger.info(f"✅ Found {currency} account with balance: ${balance_value:,.2f}")
+                    if self.balance_ttl > 0:
+                        self._balance_cache[currency] = (balance_value, time.monotonic() + self.balance_ttl)
                     return balance_value
 
             if accounts_with_balance:
@@ -148,7 +255,7 @@ class CoinbaseClient:
             # Round to 2 decimal places for Coinbase precision requirements
             usd_amount = round(usd_amount, 2)
 
-            client_order_id = f"dump_buy_{product_id}_{int(datetime.now().timestamp())}"
+            client_order_id = f"dump_buy_{product_id}_{time.time_ns()}"
 
             order_data = {
                 "client_order_id": client_order_id,
@@ -238,7 +345,7 @@ class CoinbaseClient:
 
             logger.info(f"Placing market SELL: {base_amount_rounded} of {product_id}")
 
-            client_order_id = f"dump_sell_{product_id}_{int(datetime.now().timestamp())}"
+            client_order_id = f"dump_sell_{product_id}_{time.time_ns()}"
 
             order_data = {
                 "client_order_id": client_order_id,
@@ -320,7 +427,7 @@ class CoinbaseClient:
             base_size_str = self._round_to_increment(base_size, base_increment)
             limit_price_str = self._round_to_increment(limit_price, quote_increment)
 
-            client_order_id = f"dump_limit_buy_{product_id}_{int(datetime.now().timestamp())}"
+            client_order_id = f"dump_limit_buy_{product_id}_{time.time_ns()}"
 
             order_data = {
                 "client_order_id": client_order_id,
@@ -410,7 +517,7 @@ class CoinbaseClient:
             base_amount_str = self._round_to_increment(base_amount, base_increment)
             limit_price_str = self._round_to_increment(limit_price, quote_increment)
 
-            client_order_id = f"dump_limit_sell_{product_id}_{int(datetime.now().timestamp())}"
+            client_order_id = f"dump_limit_sell_{product_id}_{time.time_ns()}"
 
             order_data = {
                 "client_order_id": client_order_id,
@@ -521,7 +628,11 @@ class CoinbaseClient:
             return {'success': False, 'error': str(e)}
 
     def get_current_price(self, product_id: str) -> Optional[float]:
-        """Get current market price for a product"""
+        """Get current market price for a product (cached for price_ttl seconds)"""
+        cached = self._price_cache.get(product_id)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
+
         try:
             path = f"/api/v3/brokerage/products/{product_id}"
             response = self._make_request('GET', path)
@@ -531,7 +642,10 @@ class CoinbaseClient:
 
             price = response.get('price')
             if price:
-                return float(price)
+                price = float(price)
+                if self.price_ttl > 0:
+                    self._price_cache[product_id] = (price, time.monotonic() + self.price_ttl)
+                return price
 
             return None
 
@@ -540,7 +654,11 @@ class CoinbaseClient:
             return None
 
     def get_product_details(self, product_id: str) -> Optional[Dict]:
-        """Get product specifications including increment and size limits"""
+        """Get product specifications including increment and size limits (cached for product_ttl seconds)"""
+        cached = self._product_cache.get(product_id)
+        if cached and time.monotonic() < cached[1]:
+            return cached[0]
+
         try:
             path = f"/api/v3/brokerage/products/{product_id}"
             response = self._make_request('GET', path)
@@ -552,7 +670,7 @@ class CoinbaseClient:
             # Log full response for debugging
             logger.info(f"Product details for {product_id}: base_increment={response.get('base_increment')}, quote_increment={response.get('quote_increment')}")
 
-            return {
+            details = {
                 'base_increment': response.get('base_increment', '0.01'),
                 'quote_increment': response.get('quote_increment', '0.01'),
                 'base_min_size': response.get('base_min_size', '0'),
@@ -560,6 +678,9 @@ class CoinbaseClient:
                 'quote_min_size': response.get('quote_min_size', '0'),
                 'quote_max_size': response.get('quote_max_size', '999999999')
             }
+            if self.product_ttl > 0:
+                self._product_cache[product_id] = (details, time.monotonic() + self.product_ttl)
+            return details
 
         except Exception as e:
             logger.error(f"Exception fetching product details: {e}")
@@ -20,42 +20,52 @@ logger = logging.getLogger(__name__)
 GMAIL_ADDRESS = os.getenv('GMAIL_ADDRESS')  # Your Gmail address
 GMAIL_APP_PASSWORD = os.getenv('GMAIL_APP_PASSWORD')  # Gmail app password
 SEND_TIME_HOUR = 20  # 8 PM CST
+MAX_CHECK_INTERVAL = 3600  # Longest single sleep before re-checking the clock
 
 DB_PATH = 'data/traderdb.db'
+RECENT_TRADES_SHOWN = 10  # Rows in the report's "Recent Trades" table
 
 
 def get_daily_stats():
     """Get today's trading statistics from database"""
-    conn = sqlite3.connect(DB_PATH)
+    # Read-only: the reporter never writes, and can't take a write lock the trader waits on
+    conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True)
+    # Rows by column name, so the report follows proven_trades' schema as defined
+    # in trader.ProvenTradeDB instead of hard-coded positions
+    conn.row_factory = sqlite3.Row
     c = conn.cursor()
 
-    # Get today's date range
     today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = datetime.now()
 
-    # Get all trades from today
+    # entry_time is stored as UTC text ('YYYY-MM-DD HH:MM:SS+00:00'), so SQLite
+    # computes local midnight in UTC and the filter stays a plain string comparison
+    # (served by idx_proven_trades_entry_time) - no Python-side parameters, and no
+    # 'T'-separated isoformat() bound that never matches the stored format.
+    # Today's totals and the open-position count come back from one statement...
     c.execute('''
-        SELECT * FROM proven_trades
-        WHERE entry_time >= ? AND entry_time <= ?
-        ORDER BY entry_time DESC
-    ''', (today_start.isoformat(), today_end.isoformat()))
-
-    rows = c.fetchall()
-    conn.close()
-
-    if not rows:
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(exit_reason = 'target_hit'), 0),
+            COALESCE(SUM(net_pnl_usd), 0),
+            (SELECT COUNT(*) FROM proven_trades WHERE status = 'OPEN')
+        FROM proven_trades
+        WHERE entry_time >= datetime('now', 'localtime', 'start of day', 'utc')
+    ''')
+    total_trades, winning_trades, total_pnl, open_positions = c.fetchone()
+
+    if total_trades == 0:
+        conn.close()
         return None
 
-    # Calculate stats
-    total_trades = len(rows)
-    winning_trades = sum(1 for row in rows if row[10] and row[10] == 'target')  # exit_reason = 'target'
-    total_pnl = sum(row[14] for row in rows if row[14])  # net_pnl_usd
-
-    # Get open positions
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM proven_trades WHERE status = 'OPEN'")
-    open_positions = c.fetchone()[0]
+    # ...and only the rows the report actually shows are fetched
+    c.execute('''
+        SELECT ticker, entry_price, exit_price, net_pnl_usd
+        FROM proven_trades
+        WHERE entry_time >= datetime('now', 'localtime', 'start of day', 'utc')
+        ORDER BY entry_time DESC
+        LIMIT ?
+    ''', (RECENT_TRADES_SHOWN,))
+    rows = c.fetchall()
     conn.close()
 
     return {
@@ -74,7 +84,7 @@ def format_email_body(stats):
     if not stats:
         return "<h2>No trades today</h2><p>The bot found no valid entry signals today.</p>"
 
-    html = f"""
+    parts = [f"""
     <html>
     <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
         <h2 style="color: #2c3e50;">📊 Daily Trading Report - {stats['date']}</h2>
@@ -119,17 +129,19 @@ def format_email_body(stats):
                     </tr>
                 </thead>
                 <tbody>
-    """
-
-    # Add recent trades (last 10)
-    for i, trade in enumerate(stats['trades'][:10]):
-        ticker = trade[1]
-        entry_price = trade[3]
-        exit_price = trade[8] if trade[8] else 'Open'
-        pnl = trade[14] if trade[14] else 0
+    """]
+
+    # Add recent trades (already limited to the last RECENT_TRADES_SHOWN in SQL) -
+    # collected and joined once at the end rather than re-copying the whole
+    # document with += per row
+    for trade in stats['trades']:
+        ticker = trade['ticker']
+        entry_price = trade['entry_price']
+        exit_price = trade['exit_price'] if trade['exit_price'] else 'Open'
+        pnl = trade['net_pnl_usd'] if trade['net_pnl_usd'] else 0
         pnl_color = '#27ae60' if pnl > 0 else '#e74c3c'
 
-        html += f"""
+        parts.append(f"""
                     <tr style="border-bottom: 1px solid #ecf0f1;">
                         <td style="padding: 8px;">{ticker}</td>
                         <td style="padding: 8px; text-align: right;">${entry_price:.4f}</td>
@@ -138,9 +150,9 @@ def format_email_body(stats):
                             ${pnl:.2f}
                         </td>
                     </tr>
-        """
+        """)
 
-    html += """
+    parts.append("""
                 </tbody>
             </table>
         </div>
@@ -151,9 +163,9 @@ def format_email_body(stats):
         </div>
     </body>
     </html>
-    """
+    """)
 
-    return html
+    return ''.join(parts)
 
 
 def send_email(to_address, subject, html_body):
@@ -184,24 +196,31 @@ async def daily_report_loop():
     while True:
         now = datetime.now()
 
-        # Check if it's 8 PM
-        if now.hour == SEND_TIME_HOUR and now.minute < 5:  # Send within first 5 minutes of 8 PM
-            logger.info("📊 Generating daily report...")
+        # Send within first 5 minutes of 8 PM; otherwise sleep toward the next 8 PM
+        # and re-check. Naive local times are off by an hour across a DST change,
+        # so each sleep is capped and the window check always decides the send.
+        if not (now.hour == SEND_TIME_HOUR and now.minute < 5):
+            next_send = now.replace(hour=SEND_TIME_HOUR, minute=0, second=0, microsecond=0)
+            if next_send <= now:
+                next_send += timedelta(days=1)
+            await asyncio.sleep(min((next_send - now).total_seconds(), MAX_CHECK_INTERVAL))
+            continue
+
+        logger.info("📊 Generating daily report...")
 
-            stats = get_daily_stats()
-            html_body = format_email_body(stats)
+        # SQLite query and SMTP send are blocking - run them off the event loop
+        # so candle polling and the API keep running while the report goes out
+        stats = await asyncio.to_thread(get_daily_stats)
+        html_body = format_email_body(stats)
 
-            subject = f"📊 Trading Bot Daily Report - {now.strftime('%Y-%m-%d')}"
-            if stats:
-                subject += f" | P&L: ${stats['total_pnl']:.2f}"
+        subject = f"📊 Trading Bot Daily Report - {now.strftime('%Y-%m-%d')}"
+        if stats:
+            subject += f" | P&L: ${stats['total_pnl']:.2f}"
 
-            send_email(GMAIL_ADDRESS, subject, html_body)
+        await asyncio.to_thread(send_email, GMAIL_ADDRESS, subject, html_body)
 
-            # Sleep for 1 hour to avoid sending multiple times
-            await asyncio.sleep(3600)
-        else:
-            # Check every 5 minutes
-            await asyncio.sleep(300)
+        # Sleep for 1 hour to avoid sending multiple times
+        await asyncio.sleep(3600)
 
 
 def start_daily_reporter():
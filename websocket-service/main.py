@@ -11,14 +11,16 @@ Runs the mathematically proven strategy using Polygon.io 1-minute candles:
 
 import asyncio
 import os
+import time
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+import aiohttp
+import orjson
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 import uvicorn
 from dotenv import load_dotenv
 from pydantic import BaseModel
@@ -39,6 +41,12 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Stablecoin pairs excluded from monitoring
+STABLECOINS = frozenset({'USDC-USD', 'USDT-USD', 'DAI-USD', 'PYUSD-USD', 'TUSD-USD', 'BUSD-USD'})
+
+# Prefix for API ETags so versions from a previous process never match
+ETAG_BOOT_ID = int(time.time())
+
 # Global state
 polygon_client = None
 proven_trader = None
@@ -50,23 +58,32 @@ async def get_all_crypto_pairs():
     """Get list of all Coinbase crypto pairs - expanded coverage"""
     try:
         coinbase = CoinbaseClient()
-        response = coinbase._make_request('GET', '/api/v3/brokerage/products')
-
-        if 'error' in response:
-            logger.error(f"Error fetching products: {response['error']}")
-            return []
-
-        products = response.get('products', [])
-
-        # Get ALL USD pairs (no EUR, GBP, etc), skip stablecoins
-        crypto_pairs = []
-        stablecoins = ['USDC-USD', 'USDT-USD', 'DAI-USD', 'PYUSD-USD', 'TUSD-USD', 'BUSD-USD']
-
-        for product in products:
-            product_id = product.get('product_id', '')
-            # Only USD pairs
-            if product_id.endswith('-USD') and product_id not in stablecoins:
-                crypto_pairs.append(f"X:{product_id}")
+        path = '/api/v3/brokerage/products'
+        try:
+            headers = coinbase.auth_headers('GET', path)
+            url = f"{coinbase.base_url}{path}"
+        finally:
+            coinbase.close()  # Only needed for signing; the fetch below uses aiohttp
+
+        # Non-blocking fetch so startup doesn't stall the event loop
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url, headers=headers) as response:
+                if response.status != 200:
+                    logger.error(f"Error fetching products: HTTP {response.status}: {await response.text()}")
+                    return []
+                # The product list is several hundred KB - orjson parses it in one pass
+                data = orjson.loads(await response.read())
+
+        products = data.get('products', ())
+
+        # Get ALL USD pairs (no EUR, GBP, etc), skip stablecoins. The suffix test
+        # rejects most products, so it runs before the stablecoin lookup
+        product_ids = (product.get('product_id', '') for product in products)
+        crypto_pairs = [
+            f"X:{product_id}" for product_id in product_ids
+            if product_id.endswith('-USD') and product_id not in STABLECOINS
+        ]
 
         logger.info(f"Found {len(crypto_pairs)} crypto pairs (Coinbase USD pairs)")
         return crypto_pairs
@@ -79,7 +96,9 @@ async def get_all_crypto_pairs():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown lifecycle"""
-    global polygon_client, proven_trader, crypto_pairs
+    global polygon_client, proven_trader, crypto_pairs, email_reporter_task
+
+    polygon_task = None
 
     logger.info("=" * 100)
     logger.info("🚀 STARTING OPTIMIZED TRADING BOT")
@@ -109,18 +128,21 @@ async def lifespan(app: FastAPI):
         logger.info("📡 Initializing Polygon.io REST client...")
         polygon_client = PolygonRestClient()
 
-        # Register candle handler
-        async def handle_candle(candle_data):
-            """Handle 1-minute candle updates from Polygon"""
-            try:
-                await proven_trader.handle_price_update(
-                    candle_data['symbol'],
-                    candle_data
-                )
-            except Exception as e:
-                logger.error(f"Error handling candle for {candle_data.get('symbol')}: {e}")
-
-        polygon_client.on_candle(handle_candle)
+        # Register candle handler (one call per fetched batch, not per candle).
+        # The trader's bound method is resolved once here and captured, rather than
+        # looked up through the module global on every candle
+        async def handle_candles(candles, handle_price_update=proven_trader.handle_price_update):
+            """Handle a batch of 1-minute candle updates from Polygon"""
+            for candle_data in candles:
+                try:
+                    await handle_price_update(
+                        candle_data.symbol,
+                        candle_data
+                    )
+                except Exception as e:
+                    logger.error("Error handling candle for %s: %s", candle_data.symbol, e)
+
+        polygon_client.on_candle_batch(handle_candles)
 
         # Connect (initialize HTTP session)
         if not await polygon_client.connect():
@@ -169,9 +191,23 @@ async def lifespan(app: FastAPI):
         # Shutdown
         logger.info("\n🛑 Shutting down services...")
 
+        # Cancel background loops and wait for them to unwind, so nothing is left
+        # mid-request when the session closes or destroyed pending by the loop
+        tasks = [task for task in (polygon_task, email_reporter_task) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
         if polygon_client:
             await polygon_client.close()
 
+        if proven_trader and proven_trader.client:
+            proven_trader.client.close()
+
+        # Last, once the cancelled tasks can no longer write trades
+        if proven_trader:
+            proven_trader.db.close()
+
         logger.info("✅ Shutdown complete")
 
 
@@ -180,7 +216,8 @@ app = FastAPI(
     title="Proven Strategy Trading Bot (Polygon)",
     description="Mathematically proven 88.71% win rate strategy using Polygon 1-min candles",
     version="5.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson serializes stats/positions far faster than stdlib json
 )
 
 # CORS middleware
@@ -192,8 +229,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Templates for frontend
-templates = Jinja2Templates(directory="templates")
+# Frontend dashboard - static HTML (data comes from /stats and /positions), so read it
+# once at startup instead of running it through Jinja on every request
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "index.html"),
+          encoding="utf-8") as f:
+    dashboard_html = f.read()
 
 # Pydantic models for request bodies
 class ToggleRequest(BaseModel):
@@ -201,9 +241,9 @@ class ToggleRequest(BaseModel):
 
 
 @app.get("/", response_class=HTMLResponse)
-async def root(request: Request):
+async def root():
     """Serve frontend dashboard"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return HTMLResponse(dashboard_html, headers={"Cache-Control": "max-age=5"})
 
 
 @app.get("/api")
@@ -223,27 +263,39 @@ async def health():
     return {
         "status": "healthy",
         "polygon_polling": polygon_client.running if polygon_client else False,
-        "pairs_monitored": len(crypto_pairs)
+        "pairs_monitored": len(crypto_pairs),
+        "pairs_ready": proven_trader.ready_pairs if proven_trader else 0
     }
 
 
+def trader_etag() -> str:
+    """Weak ETag for trader-derived data - changes only when a trade opens or closes"""
+    return f'W/"{ETAG_BOOT_ID}-{proven_trader.state_version}"'
+
+
 @app.get("/stats")
-async def get_stats():
+async def get_stats(request: Request):
     """Get trading statistics"""
     if proven_trader:
-        return proven_trader.get_stats()
+        etag = trader_etag()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return ORJSONResponse(proven_trader.get_stats(), headers={"ETag": etag})
     return {"error": "Trader not initialized"}
 
 
 @app.get("/positions")
-async def get_positions():
+async def get_positions(request: Request):
     """Get open positions"""
     if proven_trader:
-        return {
+        etag = trader_etag()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return ORJSONResponse({
             "open_positions": list(proven_trader.open_positions.values()),
             "count": len(proven_trader.open_positions),
             "max": 20
-        }
+        }, headers={"ETag": etag})
     return {"error": "Trader not initialized"}
 
 
@@ -271,5 +323,7 @@ if __name__ == "__main__":
         app,
         host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
+        loop="uvloop",      # C event loop (installed via uvicorn[standard])
+        http="httptools",   # C HTTP parser instead of pure-Python h11
         log_level="info"
     )
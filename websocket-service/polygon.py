@@ -7,15 +7,60 @@ Polls every 60 seconds for the latest completed minute candle for all pairs.
 """
 
 import os
+import time
 import asyncio
 import logging
 import aiohttp
-from datetime import datetime, timezone, timedelta
-from typing import Dict, Callable, List, Set
+import orjson
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Callable, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1024)
+def _candle_time(start_ms: int) -> datetime:
+    """
+    UTC datetime for a candle start timestamp
+
+    Every pair's candles land on the same minute boundaries, so one datetime per
+    minute is shared across all pairs instead of building one per candle.
+    """
+    return datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc)
+
+
+@dataclass(slots=True)
+class Candle:
+    """A 1-minute OHLCV candle (slotted - no per-instance dict on the hot path)"""
+    symbol: str             # Coinbase format, e.g. 'X:BTC-USD'
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    start_timestamp: int    # milliseconds
+    end_timestamp: int      # milliseconds
+    timestamp: datetime     # candle start (UTC)
+
+    @classmethod
+    def from_polygon(cls, symbol: str, bar: Dict) -> 'Candle':
+        """Build from a Polygon aggregates result ({'o','h','l','c','v','t'})"""
+        start = bar['t']
+        return cls(
+            symbol,
+            float(bar['o']),
+            float(bar['h']),
+            float(bar['l']),
+            float(bar['c']),
+            float(bar['v']),
+            start,
+            start + 60000,  # Add 1 minute
+            _candle_time(start)
+        )
+
+
 class PolygonRestClient:
     """REST API client for Polygon.io crypto minute candles"""
 
@@ -27,7 +72,17 @@ class PolygonRestClient:
         self.base_url = "https://api.polygon.io/v2/aggs/ticker"
         self.running = False
         self.subscribed_pairs: Set[str] = set()
-        self.candle_handlers: List[Callable] = []
+        # Immutable copy of subscribed_pairs for the poll loop, rebuilt only when
+        # subscribe() changes the set
+        self._pairs_snapshot: Tuple[str, ...] = ()
+        self.range_urls: Dict[str, str] = {}  # Coinbase symbol -> minute-aggregates URL prefix, built on subscribe
+        # Query params never change per client, so build them once and share across requests
+        self._poll_params = {'apiKey': self.api_key}
+        self._history_params = {'apiKey': self.api_key, 'limit': 50000}  # Max limit
+        # (handler, is_coroutine) pairs - immutable tuples rebuilt on registration,
+        # so dispatch never re-inspects handlers or iterates a list that could change
+        self.candle_handlers: Tuple[Tuple[Callable, bool], ...] = ()
+        self.batch_handlers: Tuple[Tuple[Callable, bool], ...] = ()
         self.session = None
         self.poll_interval = 60  # Poll every 60 seconds
 
@@ -35,7 +90,41 @@ class PolygonRestClient:
 
     def on_candle(self, handler: Callable):
         """Register a callback for candle updates"""
-        self.candle_handlers.append(handler)
+        self.candle_handlers += ((handler, asyncio.iscoroutinefunction(handler)),)
+
+    def on_candle_batch(self, handler: Callable):
+        """Register a callback that receives each fetched batch of candles as one list"""
+        self.batch_handlers += ((handler, asyncio.iscoroutinefunction(handler)),)
+
+    async def _dispatch_candles(self, candles: List[Candle]):
+        """
+        Fan a batch of candles out to all registered handlers
+
+        Batch handlers get one call with the whole list; per-candle handlers get
+        one call per candle.
+        """
+        if not candles:
+            return
+
+        for handler, is_async in self.batch_handlers:
+            try:
+                if is_async:
+                    await handler(candles)
+                else:
+                    handler(candles)
+            except Exception as e:
+                logger.error("Error in candle batch handler: %s", e)
+
+        handlers = self.candle_handlers
+        for candle in candles:
+            for handler, is_async in handlers:
+                try:
+                    if is_async:
+                        await handler(candle)
+                    else:
+                        handler(candle)
+                except Exception as e:
+                    logger.error("Error in candle handler for %s: %s", candle.symbol, e)
 
     def _coinbase_to_polygon(self, coinbase_symbol: str) -> str:
         """
@@ -85,6 +174,11 @@ class PolygonRestClient:
             coinbase_symbols: List of Coinbase-format symbols (e.g., ['X:BTC-USD', 'X:ETH-USD'])
         """
         self.subscribed_pairs.update(coinbase_symbols)
+        self._pairs_snapshot = tuple(self.subscribed_pairs)
+
+        # Convert symbols once here rather than on every fetch of every poll
+        for symbol in coinbase_symbols:
+            self.range_urls[symbol] = f"{self.base_url}/{self._coinbase_to_polygon(symbol)}/range/1/minute/"
         logger.info(f"✅ Added {len(coinbase_symbols)} pairs to polling list (total: {len(self.subscribed_pairs)})")
 
     async def load_historical_data(self, minutes: int = 120):
@@ -119,15 +213,7 @@ class PolygonRestClient:
             for symbol, candles in zip(batch, results):
                 if isinstance(candles, list) and len(candles) > 0:
                     # Send each historical candle through handlers
-                    for candle in candles:
-                        for handler in self.candle_handlers:
-                            try:
-                                if asyncio.iscoroutinefunction(handler):
-                                    await handler(candle)
-                                else:
-                                    handler(candle)
-                            except Exception as e:
-                                logger.error(f"Error in candle handler for {symbol}: {e}")
+                    await self._dispatch_candles(candles)
 
                     if len(candles) >= minutes:
                         full_data += 1
@@ -151,7 +237,7 @@ class PolygonRestClient:
         logger.info(f"   • {no_data} pairs starting fresh (0 candles, will accumulate from live polling)")
         logger.info(f"🎯 Bot is ready! Monitoring all {len(pairs_list)} pairs")
 
-    async def _fetch_historical_candles(self, coinbase_symbol: str, minutes: int = 120) -> List[Dict]:
+    async def _fetch_historical_candles(self, coinbase_symbol: str, minutes: int = 120) -> List[Candle]:
         """
         Fetch historical minute candles for a single pair
 
@@ -160,114 +246,88 @@ class PolygonRestClient:
             minutes: Number of minutes of history to fetch (default 120)
 
         Returns:
-            List of candle dicts in chronological order (most recent 120 candles)
+            List of Candles in chronological order (most recent 120 candles)
         """
-        polygon_symbol = self._coinbase_to_polygon(coinbase_symbol)
-
         # Fetch extra minutes to account for gaps (request 150 minutes, use most recent 120)
         fetch_minutes = int(minutes * 1.25)  # 25% buffer
-        now = datetime.now(timezone.utc)
-        end_time = int(now.timestamp() * 1000)
-        start_time = int((now - timedelta(minutes=fetch_minutes)).timestamp() * 1000)
+        end_time = time.time_ns() // 1_000_000  # Epoch milliseconds, integer math only
+        start_time = end_time - fetch_minutes * 60_000
 
-        url = f"{self.base_url}/{polygon_symbol}/range/1/minute/{start_time}/{end_time}"
-        params = {'apiKey': self.api_key, 'limit': 50000}  # Max limit
+        url = f"{self.range_urls[coinbase_symbol]}{start_time}/{end_time}"
 
         try:
-            async with self.session.get(url, params=params) as response:
+            async with self.session.get(url, params=self._history_params) as response:
                 if response.status == 200:
-                    data = await response.json()
-
-                    if data.get('status') == 'OK' and data.get('results'):
-                        all_candles = []
-                        for candle in data['results']:
-                            all_candles.append({
-                                'symbol': coinbase_symbol,
-                                'open': float(candle['o']),
-                                'high': float(candle['h']),
-                                'low': float(candle['l']),
-                                'close': float(candle['c']),
-                                'volume': float(candle['v']),
-                                'start_timestamp': candle['t'],
-                                'end_timestamp': candle['t'] + 60000,
-                                'timestamp': datetime.fromtimestamp(candle['t'] / 1000, tz=timezone.utc)
-                            })
-
-                        # Take all candles we fetched (Polygon returns them in chronological order)
-                        # If more than 'minutes' (120), take the most recent 120
-                        # If less than 120, take all (trader will wait until 120 before trading)
-                        candles = all_candles[-minutes:] if len(all_candles) > minutes else all_candles
+                    data = orjson.loads(await response.read())
+                    status = data.get('status')
+                    results = data.get('results')
+
+                    if status == 'OK' and results:
+                        # Polygon returns candles in chronological order and we fetch a 25%
+                        # buffer; only build candles for the most recent 'minutes' of them
+                        # (if fewer came back, take all - trader waits until 120 before trading)
+                        candles = [
+                            Candle.from_polygon(coinbase_symbol, bar)
+                            for bar in results[-minutes:]
+                        ]
 
                         # Accept any amount of historical data - trader will accumulate more from live polling
                         if len(candles) > 0:
                             if len(candles) < minutes:
-                                logger.debug(f"{coinbase_symbol}: Loaded {len(candles)}/{minutes} candles, will accumulate rest from polling")
+                                logger.debug("%s: Loaded %d/%d candles, will accumulate rest from polling", coinbase_symbol, len(candles), minutes)
                             return candles
                         else:
-                            logger.debug(f"{coinbase_symbol}: No historical data, will start from live polling")
+                            logger.debug("%s: No historical data, will start from live polling", coinbase_symbol)
                     else:
-                        logger.warning(f"No historical data for {coinbase_symbol}: {data.get('status')}")
+                        logger.warning("No historical data for %s: %s", coinbase_symbol, status)
                 else:
-                    logger.warning(f"Failed to fetch historical {coinbase_symbol}: HTTP {response.status}")
+                    logger.warning("Failed to fetch historical %s: HTTP %s", coinbase_symbol, response.status)
         except Exception as e:
-            logger.error(f"Error fetching historical candles for {coinbase_symbol}: {e}")
+            logger.error("Error fetching historical candles for %s: %s", coinbase_symbol, e)
 
         return []
 
-    async def _fetch_candle(self, coinbase_symbol: str) -> Dict:
+    async def _fetch_candle(self, coinbase_symbol: str) -> Optional[Candle]:
         """
         Fetch the latest minute candle for a single pair
 
         Returns the most recent completed 1-minute candle
         """
-        polygon_symbol = self._coinbase_to_polygon(coinbase_symbol)
-
         # Get the last 2 minutes of data (to ensure we get the most recent completed candle)
-        now = datetime.now(timezone.utc)
-        end_time = int(now.timestamp() * 1000)
-        start_time = int((now - timedelta(minutes=2)).timestamp() * 1000)
+        end_time = time.time_ns() // 1_000_000  # Epoch milliseconds, integer math only
+        start_time = end_time - 2 * 60_000
 
-        url = f"{self.base_url}/{polygon_symbol}/range/1/minute/{start_time}/{end_time}"
-        params = {'apiKey': self.api_key}
+        url = f"{self.range_urls[coinbase_symbol]}{start_time}/{end_time}"
 
         try:
-            async with self.session.get(url, params=params) as response:
+            async with self.session.get(url, params=self._poll_params) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = orjson.loads(await response.read())
+                    results = data.get('results')
 
-                    if data.get('status') == 'OK' and data.get('results'):
+                    if results and data.get('status') == 'OK':
                         # Get the most recent candle
-                        latest = data['results'][-1]
-
-                        return {
-                            'symbol': coinbase_symbol,
-                            'open': float(latest['o']),
-                            'high': float(latest['h']),
-                            'low': float(latest['l']),
-                            'close': float(latest['c']),
-                            'volume': float(latest['v']),
-                            'start_timestamp': latest['t'],  # milliseconds
-                            'end_timestamp': latest['t'] + 60000,  # Add 1 minute
-                            'timestamp': datetime.fromtimestamp(latest['t'] / 1000, tz=timezone.utc)
-                        }
+                        latest = results[-1]
+
+                        return Candle.from_polygon(coinbase_symbol, latest)
                 else:
-                    logger.warning(f"Failed to fetch {coinbase_symbol}: HTTP {response.status}")
+                    logger.warning("Failed to fetch %s: HTTP %s", coinbase_symbol, response.status)
 
         except Exception as e:
-            logger.error(f"Error fetching candle for {coinbase_symbol}: {e}")
+            logger.error("Error fetching candle for %s: %s", coinbase_symbol, e)
 
         return None
 
     async def _poll_all_pairs(self):
         """Poll all subscribed pairs for latest candles"""
-        if not self.subscribed_pairs:
+        pairs_list = self._pairs_snapshot
+        if not pairs_list:
             return
 
-        logger.debug(f"Polling {len(self.subscribed_pairs)} pairs...")
+        logger.debug("Polling %d pairs...", len(pairs_list))
 
         # Fetch in batches to avoid overwhelming the API
         batch_size = 10  # Process 10 pairs concurrently
-        pairs_list = list(self.subscribed_pairs)
 
         for i in range(0, len(pairs_list), batch_size):
             batch = pairs_list[i:i+batch_size]
@@ -276,18 +336,9 @@ class PolygonRestClient:
             tasks = [self._fetch_candle(symbol) for symbol in batch]
             results = await asyncio.gather(*tasks, return_exceptions=True)
 
-            # Process results
-            for candle_data in results:
-                if candle_data and isinstance(candle_data, dict):
-                    # Call all registered handlers
-                    for handler in self.candle_handlers:
-                        try:
-                            if asyncio.iscoroutinefunction(handler):
-                                await handler(candle_data)
-                            else:
-                                handler(candle_data)
-                        except Exception as e:
-                            logger.error(f"Error in candle handler: {e}")
+            # Process results - one fan-out for the whole batch
+            candles = [candle_data for candle_data in results if isinstance(candle_data, Candle)]
+            await self._dispatch_candles(candles)
 
             # Small delay between batches to respect rate limits
             await asyncio.sleep(0.5)
@@ -298,6 +349,8 @@ class PolygonRestClient:
         logger.info(f"🔄 Starting Polygon REST polling (every {self.poll_interval}s)...")
 
         poll_count = 0
+        loop = asyncio.get_running_loop()
+        next_poll = loop.time()
 
         try:
             while self.running:
@@ -308,10 +361,19 @@ class PolygonRestClient:
 
                 await self._poll_all_pairs()
 
-                logger.info(f"✅ Polling cycle #{poll_count} complete, sleeping {self.poll_interval}s")
+                # Fixed-rate schedule: a cycle starts every poll_interval seconds no matter
+                # how long the fetches took, so cycles don't drift behind the minute
+                # candles. If a cycle overran, skip the missed slots rather than bursting.
+                next_poll += self.poll_interval
+                now = loop.time()
+                if next_poll < now:
+                    next_poll += (now - next_poll) // self.poll_interval * self.poll_interval + self.poll_interval
+                delay = next_poll - now
+
+                logger.info(f"✅ Polling cycle #{poll_count} complete, sleeping {delay:.1f}s")
 
-                # Wait for next poll interval
-                await asyncio.sleep(self.poll_interval)
+                # Wait for next poll slot
+                await asyncio.sleep(delay)
 
         except Exception as e:
             logger.error(f"Error in polling loop: {e}", exc_info=True)
@@ -335,12 +397,12 @@ async def test_polygon_rest():
 
     # Handler to print candles
     def print_candle(candle):
-        print(f"\n📊 {candle['symbol']}")
-        print(f"   Open:  ${candle['open']:.4f}")
-        print(f"   High:  ${candle['high']:.4f}")
-        print(f"   Low:   ${candle['low']:.4f}")
-        print(f"   Close: ${candle['close']:.4f}")
-        print(f"   Time:  {candle['timestamp']}")
+        print(f"\n📊 {candle.symbol}")
+        print(f"   Open:  ${candle.open:.4f}")
+        print(f"   High:  ${candle.high:.4f}")
+        print(f"   Low:   ${candle.low:.4f}")
+        print(f"   Close: ${candle.close:.4f}")
+        print(f"   Time:  {candle.timestamp}")
 
     client.on_candle(print_candle)
 
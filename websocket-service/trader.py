@@ -15,10 +15,13 @@ Quality over quantity - fewer trades with much higher win rate to minimize fees
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List
 import sqlite3
+import numpy as np
 from coinbase_client import CoinbaseClient
+from polygon import Candle
 import os
 
 # ============================================================================
@@ -34,6 +37,8 @@ VOL_RECENT_WINDOW = 10   # Last 10 candles for recent volatility
 VOL_HISTORICAL_WINDOW = 110  # Candles 11-120 for historical volatility
 VOL_SPIKE_THRESHOLD = 2.5  # Recent vol must be 2.5x historical (strict)
 MIN_DUMP_PCT = -0.04     # Minimum -4% dump required (stricter than old -3%)
+DUMP_LOG_PCT = -0.03     # Dumps of 3%+ are logged for debugging
+DUMP_GATE_PCT = max(DUMP_LOG_PCT, MIN_DUMP_PCT)  # Smaller moves skip signal evaluation entirely
 
 # Support level detection
 SUPPORT_DISTANCE_THRESHOLD = 0.015  # Within 1.5% of 120-candle support (strict)
@@ -51,6 +56,17 @@ ENTRY_FEE = 0.012  # 1.2% market order (taker)
 EXIT_FEE = 0.006   # 0.6% limit order (maker)
 TOTAL_FEES = ENTRY_FEE + EXIT_FEE  # 1.8%
 
+# Price multipliers derived from the above, computed once instead of per trade/candle
+ENTRY_FEE_MULT = 1 + ENTRY_FEE
+EXIT_FEE_MULT = 1 - EXIT_FEE
+TARGET_MULT = 1 + EXIT_TARGET
+STOP_MULT = 1 + EMERGENCY_STOP_LOSS
+MAX_HOLD_TIME = timedelta(minutes=MAX_HOLD_MINUTES)
+
+# Order fill confirmation (market orders usually fill instantly)
+ORDER_FILL_TIMEOUT = 2.0        # Max seconds to wait for a buy to report FILLED
+ORDER_FILL_POLL_INTERVAL = 0.25  # Seconds between order status checks
+
 # Position sizing (optimized for quality over quantity)
 INITIAL_CAPITAL = float(os.getenv('PROVEN_INITIAL_CAPITAL', '400'))
 POSITION_SIZE_USD = 40.0  # $40 per trade (fixed position size)
@@ -61,13 +77,13 @@ MIN_PRICE = 0.05
 MIN_AVG_VOLUME_USD = 2000
 
 # Blacklist (from analysis)
-BLACKLIST = {
+BLACKLIST = frozenset({
     'X:UST-USD',     # Failed algorithmic stablecoin
     'X:STRD-USD',    # Dying coin
     'X:CTX-USD',     # Crash event
     'X:PIRATE-USD',  # Delisting
     'X:SHPING-USD',  # Project collapse
-}
+})
 
 # Trading mode
 AUTO_TRADE = os.getenv('PROVEN_AUTO_TRADE', 'no').lower() == 'yes'
@@ -90,116 +106,119 @@ class ProvenTradeDB:
     def __init__(self, db_path='data/traderdb.db'):
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.db_path = db_path
+        # One connection for the life of the trader instead of a connect/close per
+        # operation; each write runs in its own transaction via 'with self._conn'.
+        # Only used from the event loop thread (see ProvenDumpTrader)
+        self._conn = self._connect()
         self._init_db()
 
-    def _init_db(self):
+    def _connect(self):
         conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS proven_trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticker TEXT NOT NULL,
-                entry_time DATETIME NOT NULL,
-                entry_price REAL NOT NULL,
-                dump_pct REAL NOT NULL,
-                rsi REAL NOT NULL,
-                position_size_usd REAL NOT NULL,
-                target_price REAL NOT NULL,
-                stop_price REAL NOT NULL,
-                exit_price REAL,
-                exit_time DATETIME,
-                exit_reason TEXT,
-                minutes_held INTEGER,
-                gross_pnl_pct REAL,
-                net_pnl_pct REAL,
-                net_pnl_usd REAL,
-                capital_before REAL NOT NULL,
-                capital_after REAL,
-                status TEXT NOT NULL,
-                entry_order_id TEXT,
-                exit_order_id TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
+        # WAL (set in _init_db) makes each commit a log append, so NORMAL sync is
+        # still crash-safe for the database; it just skips an fsync per commit
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _init_db(self):
+        conn = self._conn
+        # WAL is persistent on the file: the trader's writes no longer block the
+        # daily reporter's reads (or vice versa)
+        conn.execute('PRAGMA journal_mode=WAL')
+
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS proven_trades (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ticker TEXT NOT NULL,
+                    entry_time DATETIME NOT NULL,
+                    entry_price REAL NOT NULL,
+                    dump_pct REAL NOT NULL,
+                    rsi REAL NOT NULL,
+                    position_size_usd REAL NOT NULL,
+                    target_price REAL NOT NULL,
+                    stop_price REAL NOT NULL,
+                    exit_price REAL,
+                    exit_time DATETIME,
+                    exit_reason TEXT,
+                    minutes_held INTEGER,
+                    gross_pnl_pct REAL,
+                    net_pnl_pct REAL,
+                    net_pnl_usd REAL,
+                    capital_before REAL NOT NULL,
+                    capital_after REAL,
+                    status TEXT NOT NULL,
+                    entry_order_id TEXT,
+                    exit_order_id TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # get_stats and the open-trades lookup filter on status; the daily
+            # report filters and orders today's trades by entry_time
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_proven_trades_status ON proven_trades(status)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_proven_trades_entry_time ON proven_trades(entry_time)')
+
+    def close(self):
+        """Close the persistent connection (checkpoints the WAL on a clean exit)"""
+        self._conn.close()
 
     def insert_trade(self, trade_data):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        c.execute('''
-            INSERT INTO proven_trades (
-                ticker, entry_time, entry_price, dump_pct, rsi, position_size_usd,
-                target_price, stop_price, capital_before, status, entry_order_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            trade_data['ticker'],
-            trade_data['entry_time'],
-            trade_data['entry_price'],
-            trade_data['dump_pct'],
-            trade_data['rsi'],
-            trade_data['position_size_usd'],
-            trade_data['target_price'],
-            trade_data['stop_price'],
-            trade_data['capital_before'],
-            trade_data['status'],
-            trade_data.get('entry_order_id')
-        ))
-
-        trade_id = c.lastrowid
-        conn.commit()
-        conn.close()
-        return trade_id
+        with self._conn:
+            c = self._conn.execute('''
+                INSERT INTO proven_trades (
+                    ticker, entry_time, entry_price, dump_pct, rsi, position_size_usd,
+                    target_price, stop_price, capital_before, status, entry_order_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                trade_data['ticker'],
+                trade_data['entry_time'],
+                trade_data['entry_price'],
+                trade_data['dump_pct'],
+                trade_data['rsi'],
+                trade_data['position_size_usd'],
+                trade_data['target_price'],
+                trade_data['stop_price'],
+                trade_data['capital_before'],
+                trade_data['status'],
+                trade_data.get('entry_order_id')
+            ))
+
+        return c.lastrowid
 
     def update_trade_exit(self, trade_id, exit_data):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        c.execute('''
-            UPDATE proven_trades SET
-                exit_price = ?,
-                exit_time = ?,
-                exit_reason = ?,
-                minutes_held = ?,
-                gross_pnl_pct = ?,
-                net_pnl_pct = ?,
-                net_pnl_usd = ?,
-                capital_after = ?,
-                status = ?,
-                exit_order_id = ?
-            WHERE id = ?
-        ''', (
-            exit_data['exit_price'],
-            exit_data['exit_time'],
-            exit_data['exit_reason'],
-            exit_data['minutes_held'],
-            exit_data['gross_pnl_pct'],
-            exit_data['net_pnl_pct'],
-            exit_data['net_pnl_usd'],
-            exit_data['capital_after'],
-            exit_data['status'],
-            exit_data.get('exit_order_id'),
-            trade_id
-        ))
-
-        conn.commit()
-        conn.close()
+        with self._conn:
+            self._conn.execute('''
+                UPDATE proven_trades SET
+                    exit_price = ?,
+                    exit_time = ?,
+                    exit_reason = ?,
+                    minutes_held = ?,
+                    gross_pnl_pct = ?,
+                    net_pnl_pct = ?,
+                    net_pnl_usd = ?,
+                    capital_after = ?,
+                    status = ?,
+                    exit_order_id = ?
+                WHERE id = ?
+            ''', (
+                exit_data['exit_price'],
+                exit_data['exit_time'],
+                exit_data['exit_reason'],
+                exit_data['minutes_held'],
+                exit_data['gross_pnl_pct'],
+                exit_data['net_pnl_pct'],
+                exit_data['net_pnl_usd'],
+                exit_data['capital_after'],
+                exit_data['status'],
+                exit_data.get('exit_order_id'),
+                trade_id
+            ))
 
     def get_open_trades(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        c.execute('''
+        rows = self._conn.execute('''
             SELECT * FROM proven_trades
             WHERE status = 'OPEN'
             ORDER BY entry_time ASC
-        ''')
-
-        rows = c.fetchall()
-        conn.close()
+        ''').fetchall()
 
         trades = []
         for row in rows:
@@ -220,15 +239,21 @@ class ProvenTradeDB:
         return trades
 
     def get_stats(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        # Total trades
-        c.execute('SELECT COUNT(*) FROM proven_trades WHERE status = "CLOSED"')
-        total_trades = c.fetchone()[0]
+        # One pass over the table: closed/winner/open counts, total P&L, and the
+        # latest closing capital, instead of a query per figure
+        row = self._conn.execute('''
+            SELECT
+                COALESCE(SUM(status = 'CLOSED'), 0),
+                COALESCE(SUM(status = 'CLOSED' AND net_pnl_usd > 0), 0),
+                COALESCE(SUM(CASE WHEN status = 'CLOSED' THEN net_pnl_usd END), 0),
+                COALESCE(SUM(status = 'OPEN'), 0),
+                (SELECT capital_after FROM proven_trades
+                 WHERE status = 'CLOSED' ORDER BY exit_time DESC LIMIT 1)
+            FROM proven_trades
+        ''').fetchone()
+        total_trades, winners, total_pnl, open_positions, last_capital = row
 
         if total_trades == 0:
-            conn.close()
             return {
                 'total_trades': 0,
                 'winners': 0,
@@ -243,24 +268,7 @@ class ProvenTradeDB:
                 'expected_return': 49.51     # 7-day backtest return with 24h timeout
             }
 
-        # Winners
-        c.execute('SELECT COUNT(*) FROM proven_trades WHERE status = "CLOSED" AND net_pnl_usd > 0')
-        winners = c.fetchone()[0]
-
-        # Total P&L
-        c.execute('SELECT SUM(net_pnl_usd) FROM proven_trades WHERE status = "CLOSED"')
-        total_pnl = c.fetchone()[0] or 0
-
-        # Current capital
-        c.execute('SELECT capital_after FROM proven_trades WHERE status = "CLOSED" ORDER BY exit_time DESC LIMIT 1')
-        result = c.fetchone()
-        current_capital = result[0] if result else INITIAL_CAPITAL
-
-        # Open positions
-        c.execute('SELECT COUNT(*) FROM proven_trades WHERE status = "OPEN"')
-        open_positions = c.fetchone()[0]
-
-        conn.close()
+        current_capital = last_capital if last_capital is not None else INITIAL_CAPITAL
 
         win_rate = (winners / total_trades * 100) if total_trades > 0 else 0
         avg_pnl = (total_pnl / total_trades) if total_trades > 0 else 0
@@ -280,6 +288,57 @@ class ProvenTradeDB:
             'expected_return': 49.51     # 7-day backtest return with 24h timeout
         }
 
+# ============================================================================
+# CANDLE WINDOW
+# ============================================================================
+
+class CandleWindow:
+    """Rolling window of the last N candles stored as contiguous NumPy arrays
+
+    float32 is plenty for ratio checks against percent thresholds and halves
+    the memory touched per window.
+
+    The backing buffers hold 2N candles so appends are a single store; the
+    window is only slid back to the front once every N appends, making the
+    per-candle cost amortized O(1) instead of an O(N) shift.
+    """
+
+    # One window per pair, touched on every candle: slots skip the per-instance dict
+    __slots__ = ('size', 'count', '_end', '_closes', '_lows')
+
+    def __init__(self, size: int = CANDLE_LOOKBACK):
+        self.size = size
+        self.count = 0
+        self._end = 0  # Next write position in the backing buffers
+        self._closes = np.zeros(2 * size, dtype=np.float32)
+        self._lows = np.zeros(2 * size, dtype=np.float32)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def closes(self) -> np.ndarray:
+        return self._closes[self._end - self.count:self._end]
+
+    @property
+    def lows(self) -> np.ndarray:
+        return self._lows[self._end - self.count:self._end]
+
+    def append(self, close: float, low: float):
+        """Add a candle, dropping the oldest once the window is full"""
+        if self._end == len(self._closes):
+            keep = self.size - 1
+            self._closes[:keep] = self._closes[self._end - keep:self._end]
+            self._lows[:keep] = self._lows[self._end - keep:self._end]
+            self._end = keep
+
+        self._closes[self._end] = close
+        self._lows[self._end] = low
+        self._end += 1
+
+        if self.count < self.size:
+            self.count += 1
+
 # ============================================================================
 # RSI CALCULATOR
 # ============================================================================
@@ -289,20 +348,13 @@ class RSICalculator:
 
     @staticmethod
     def calculate(prices: List[float], period: int = 14) -> Optional[float]:
-        """Calculate RSI from price list"""
+        """Calculate RSI from a price list or array (vectorized over the lookback)"""
         if len(prices) < period + 1:
             return None
 
-        recent_prices = prices[-(period + 1):]
-        gains = 0
-        losses = 0
-
-        for i in range(1, len(recent_prices)):
-            change = recent_prices[i] - recent_prices[i - 1]
-            if change > 0:
-                gains += change
-            else:
-                losses += abs(change)
+        changes = np.diff(np.asarray(prices[-(period + 1):], dtype=np.float64))
+        gains = changes[changes > 0].sum()
+        losses = -changes[changes < 0].sum()
 
         avg_gain = gains / period
         avg_loss = losses / period
@@ -313,19 +365,31 @@ class RSICalculator:
         rs = avg_gain / avg_loss
         rsi = 100 - (100 / (1 + rs))
 
-        return rsi
+        return float(rsi)
 
 # ============================================================================
 # PROVEN DUMP TRADER
 # ============================================================================
 
 class ProvenDumpTrader:
+    """
+    Candle-driven dump trader
+
+    Single-writer: all in-memory state (price_history, open_positions, counters)
+    is only mutated from coroutines on the event loop, so API handlers can read
+    it directly without locks or defensive copies. Anything that runs in a worker
+    thread must not touch this state.
+    """
+
     def __init__(self):
         self.db = ProvenTradeDB()
         self.client = CoinbaseClient() if AUTO_TRADE else None
+        self.auto_trade = AUTO_TRADE  # Runtime switch (/toggle-trading); live orders also need a client
         self.current_capital = INITIAL_CAPITAL
         self.open_positions: Dict[str, dict] = {}
-        self.price_history: Dict[str, list] = {}  # Store last 120 candles per ticker
+        self.price_history: Dict[str, CandleWindow] = {}  # Last 120 closes/lows per ticker
+        self.ready_pairs = 0  # Tickers with a full 120-candle window (maintained incrementally)
+        self.state_version = 0  # Bumped on every entry/exit so the API can serve ETags
 
         logger.info("=" * 80)
         logger.info("PROVEN DUMP TRADER - Vol AND Support (120 Candles)")
@@ -339,80 +403,62 @@ class ProvenDumpTrader:
         logger.info(f"Auto-Trade: {AUTO_TRADE}")
         logger.info("=" * 80)
 
-    async def handle_price_update(self, ticker: str, price_data: dict):
-        """
-        Handle real-time price updates from WebSocket
-
-        Expected price_data: {
-            'open': float,
-            'high': float,
-            'low': float,
-            'close': float,
-            'timestamp': datetime
-        }
-        """
+    async def handle_price_update(self, ticker: str, price_data: Candle):
+        """Handle a 1-minute candle update from Polygon"""
         # Skip blacklisted coins
         if ticker in BLACKLIST:
             return
 
-        # Update price history
-        if ticker not in self.price_history:
-            self.price_history[ticker] = []
+        # Update price history (window keeps only the last 120 candles)
+        window = self.price_history.get(ticker)
+        if window is None:
+            window = self.price_history[ticker] = CandleWindow()
 
-        self.price_history[ticker].append(price_data)
+        filling = len(window) < CANDLE_LOOKBACK
+        window.append(price_data.close, price_data.low)
+        full = len(window) >= CANDLE_LOOKBACK
 
-        # Keep only last 120 candles (for volatility and support detection)
-        if len(self.price_history[ticker]) > 120:
-            self.price_history[ticker] = self.price_history[ticker][-120:]
+        if filling and full:
+            self.ready_pairs += 1
+            logger.info(f"🎯 {ticker} now has {CANDLE_LOOKBACK} candles - READY TO EVALUATE SIGNALS")
 
-        # Check for entry signal (need at least 120 candles for Vol AND Support strategy)
-        if len(self.price_history[ticker]) >= 120:
-            await self._check_entry_signal(ticker, price_data)
+        # Check for entry signal (need at least 120 candles for Vol AND Support strategy).
+        # Short-circuit here for tickers we couldn't enter anyway - already holding it,
+        # or at max concurrent positions - so they skip the signal evaluation entirely
+        if (full and ticker not in self.open_positions
+                and len(self.open_positions) < MAX_CONCURRENT_POSITIONS):
+            await self._check_entry_signal(ticker, price_data, window)
 
         # Check exit conditions for open positions
-        if ticker in self.open_positions:
-            await self._check_exit_conditions(ticker, price_data)
+        position = self.open_positions.get(ticker)
+        if position is not None:
+            await self._check_exit_conditions(ticker, price_data, position)
 
-    async def _check_entry_signal(self, ticker: str, current_candle: dict):
-        """Check if current price action triggers entry signal (Vol AND Support 120 candles)"""
-
-        # Don't enter if already have position in this ticker
-        if ticker in self.open_positions:
-            return
-
-        # Don't enter if we're at max concurrent positions
-        if len(self.open_positions) >= MAX_CONCURRENT_POSITIONS:
-            logger.debug(f"At max concurrent positions ({MAX_CONCURRENT_POSITIONS}), skipping {ticker}")
-            return
+    async def _check_entry_signal(self, ticker: str, current_candle: Candle, window: CandleWindow):
+        """
+        Check if current price action triggers entry signal (Vol AND Support 120 candles)
 
-        # Need at least 120 candles
-        candle_count = len(self.price_history[ticker])
-        if candle_count < CANDLE_LOOKBACK:
+        Caller passes the ticker's window it just appended to, and guarantees it is
+        full, there is no open position in this ticker, and there is room under
+        MAX_CONCURRENT_POSITIONS.
+        """
+        closes = window.closes
+        lows = window.lows
+
+        # Cheap scalar gate: most candles aren't dumps, so skip the window math
+        # unless this one is big enough to be logged (<= -3%) or traded
+        prev_close = float(closes[-2])
+        priceChange = (current_candle.close - prev_close) / prev_close
+        if priceChange > DUMP_GATE_PCT:
             return
 
-        # Log when a pair first becomes ready to trade
-        if candle_count == CANDLE_LOOKBACK:
-            logger.info(f"🎯 {ticker} now has {CANDLE_LOOKBACK} candles - READY TO EVALUATE SIGNALS")
-
-        candles = self.price_history[ticker]
-        i = len(candles) - 1  # Current candle index
-
         # ========================================================================
         # 1. VOLATILITY EXPANSION CHECK
         # ========================================================================
-        recentVol = 0.0
-        for j in range(i - VOL_RECENT_WINDOW + 1, i + 1):
-            if j > 0:
-                change = abs((candles[j]['close'] - candles[j-1]['close']) / candles[j-1]['close'])
-                recentVol += change
-        recentVol /= VOL_RECENT_WINDOW
-
-        historicalVol = 0.0
-        for j in range(i - CANDLE_LOOKBACK + 1, i - VOL_RECENT_WINDOW + 1):
-            if j > 0:
-                change = abs((candles[j]['close'] - candles[j-1]['close']) / candles[j-1]['close'])
-                historicalVol += change
-        historicalVol /= VOL_HISTORICAL_WINDOW
+        # Absolute candle-to-candle returns across the window (119 values)
+        changes = np.abs(np.diff(closes) / closes[:-1])
+        recentVol = float(changes[-VOL_RECENT_WINDOW:].sum()) / VOL_RECENT_WINDOW
+        historicalVol = float(changes[:-VOL_RECENT_WINDOW].sum()) / VOL_HISTORICAL_WINDOW
 
         if historicalVol == 0:
             return  # Can't calculate vol ratio
@@ -424,11 +470,9 @@ class ProvenDumpTrader:
         # ========================================================================
         # 2. DUMP CHECK
         # ========================================================================
-        priceChange = (current_candle['close'] - candles[i-1]['close']) / candles[i-1]['close']
-
         # Log significant dumps for debugging
-        if priceChange <= -0.03:  # Any dump >= 3%
-            logger.info(f"💥 {ticker}: {priceChange*100:.2f}% dump detected (volRatio: {volRatio:.2f}x)")
+        if priceChange <= DUMP_LOG_PCT and logger.isEnabledFor(logging.INFO):  # Any dump >= 3%
+            logger.info("💥 %s: %.2f%% dump detected (volRatio: %.2fx)", ticker, priceChange * 100, volRatio)
 
         if priceChange > MIN_DUMP_PCT:
             return  # Not a big enough dump
@@ -436,11 +480,8 @@ class ProvenDumpTrader:
         # ========================================================================
         # 3. SUPPORT LEVEL CHECK (120-candle support)
         # ========================================================================
-        currentPrice = current_candle['close']
-        supportLevel = float('inf')
-
-        for j in range(i - CANDLE_LOOKBACK + 1, i):
-            supportLevel = min(supportLevel, candles[j]['low'])
+        currentPrice = current_candle.close
+        supportLevel = float(lows[:-1].min())  # Lowest low of the prior 119 candles
 
         distanceFromSupport = (currentPrice - supportLevel) / supportLevel
         if distanceFromSupport > SUPPORT_DISTANCE_THRESHOLD:
@@ -449,7 +490,7 @@ class ProvenDumpTrader:
         # ========================================================================
         # 4. AVOID LONG-TERM DOWNTRENDS
         # ========================================================================
-        price120ago = candles[i - CANDLE_LOOKBACK + 1]['close']
+        price120ago = float(closes[0])
         longTermChange = (currentPrice - price120ago) / price120ago
         if longTermChange < MAX_DOWNTREND_PCT:
             return  # In a severe downtrend, avoid
@@ -457,8 +498,7 @@ class ProvenDumpTrader:
         # ========================================================================
         # 5. RSI CHECK
         # ========================================================================
-        prices = [candle['close'] for candle in candles]
-        rsi = RSICalculator.calculate(prices, period=14)
+        rsi = RSICalculator.calculate(closes, period=14)
 
         if rsi is None:
             return  # Not enough data for RSI
@@ -469,8 +509,8 @@ class ProvenDumpTrader:
         # ========================================================================
         # 6. QUALITY FILTERS
         # ========================================================================
-        if current_candle['close'] < MIN_PRICE:
-            logger.debug(f"{ticker}: Price too low (${current_candle['close']:.4f})")
+        if current_candle.close < MIN_PRICE:
+            logger.debug("%s: Price too low ($%.4f)", ticker, current_candle.close)
             return
 
         # ========================================================================
@@ -484,22 +524,22 @@ class ProvenDumpTrader:
         }
         await self._execute_entry(ticker, current_candle, signal_data)
 
-    async def _execute_entry(self, ticker: str, candle: dict, signal_data: dict):
+    async def _execute_entry(self, ticker: str, candle: Candle, signal_data: dict):
         """Execute entry trade"""
 
         # CRITICAL: Enter at CLOSE, not LOW
         # We detect signals after candle closes. Entering at 'low' is unrealistic.
         # Backtest uses close and achieves 93.3% win rate.
-        entry_price = candle['close']  # Enter at the close (realistic)
-        entry_time = candle.get('timestamp', datetime.now())
+        entry_price = candle.close  # Enter at the close (realistic)
+        entry_time = candle.timestamp
 
         # Fixed position size
         position_size_usd = POSITION_SIZE_USD
 
         # Calculate prices with fees
-        entry_with_fee = entry_price * (1 + ENTRY_FEE)
-        target_price = entry_with_fee * (1 + EXIT_TARGET)
-        stop_price = entry_with_fee * (1 + EMERGENCY_STOP_LOSS)
+        entry_with_fee = entry_price * ENTRY_FEE_MULT
+        target_price = entry_with_fee * TARGET_MULT
+        stop_price = entry_with_fee * STOP_MULT
 
         logger.info("=" * 80)
         logger.info(f"🚨 ENTRY SIGNAL: {ticker}")
@@ -530,13 +570,13 @@ class ProvenDumpTrader:
             'status': 'OPEN'
         }
 
-        if AUTO_TRADE and self.client:
+        if self.auto_trade and self.client:
             try:
                 # Normalize product_id: Remove 'X:' prefix for Coinbase API
                 product_id = ticker.replace('X:', '') if ticker.startswith('X:') else ticker
 
                 # Place market buy order
-                entry_order = self.client.market_buy(product_id, position_size_usd)
+                entry_order = await asyncio.to_thread(self.client.market_buy, product_id, position_size_usd)
                 if not entry_order.get('success'):
                     logger.error(f"   ❌ Buy order failed: {entry_order.get('error')}")
                     return
@@ -545,12 +585,8 @@ class ProvenDumpTrader:
                 trade_data['entry_order_id'] = order_id
                 logger.info(f"   ✅ Buy order placed: {order_id}")
 
-                # Wait for order to fill (market orders are usually instant)
-                import time
-                time.sleep(2)  # Give it 2 seconds to fill
-
-                # Check order status to get filled_size AND actual fill price
-                order_status = self.client.get_order_status(order_id)
+                # Wait for order to fill and get filled_size AND actual fill price
+                order_status = await self._wait_for_fill(order_id)
                 if order_status.get('success'):
                     base_amount = float(order_status.get('filled_size', 0))
                     order_details = order_status.get('order', {})
@@ -564,8 +600,8 @@ class ProvenDumpTrader:
                         return
 
                     # RECALCULATE target based on ACTUAL fill price (not test price)
-                    actual_target_price = actual_fill_price * (1 + EXIT_TARGET)
-                    actual_stop_price = actual_fill_price * (1 + EMERGENCY_STOP_LOSS)
+                    actual_target_price = actual_fill_price * TARGET_MULT
+                    actual_stop_price = actual_fill_price * STOP_MULT
 
                     logger.info(f"   📊 Recalculated target from actual fill: ${actual_target_price:.4f} (+{EXIT_TARGET*100:.1f}%)")
 
@@ -575,7 +611,8 @@ class ProvenDumpTrader:
                     trade_data['stop_price'] = actual_stop_price
 
                     # Place limit sell order at actual target
-                    exit_order = self.client.limit_sell(product_id, actual_target_price, base_amount)
+                    exit_order = await asyncio.to_thread(
+                        self.client.limit_sell, product_id, actual_target_price, base_amount)
                     if exit_order.get('success'):
                         logger.info(f"   ✅ Sell order placed: {exit_order['order_id']} @ ${actual_target_price:.4f}")
                         trade_data['exit_order_id'] = exit_order.get('order_id')
@@ -589,10 +626,12 @@ class ProvenDumpTrader:
                 logger.error(f"   ❌ Order execution failed: {e}")
                 return
         else:
-            logger.info("   📝 PAPER TRADE (AUTO_TRADE=no)")
+            reason = "auto-trading disabled" if not self.auto_trade else "no Coinbase client"
+            logger.info(f"   📝 PAPER TRADE ({reason})")
 
         # Save to database
         trade_id = self.db.insert_trade(trade_data)
+        self.state_version += 1
 
         # Track in memory (use actual prices from trade_data which may have been updated)
         self.open_positions[ticker] = {
@@ -606,35 +645,57 @@ class ProvenDumpTrader:
 
         logger.info(f"   Trade #{trade_id} opened")
 
-    async def _check_exit_conditions(self, ticker: str, current_candle: dict):
-        """Check if position should be exited"""
+    async def _wait_for_fill(self, order_id: str) -> dict:
+        """
+        Poll order status until it reports FILLED or ORDER_FILL_TIMEOUT passes
+
+        Returns as soon as the fill is confirmed instead of always waiting the full
+        timeout, and sleeps with asyncio so candle processing isn't blocked meanwhile.
+        The blocking REST call itself runs in a worker thread for the same reason.
+        A failed lookup is retried - a just-placed order may not be readable yet, and
+        giving up would leave the bought position with no row and no exit order.
+        At the deadline the last status seen is returned.
+        """
+        deadline = time.monotonic() + ORDER_FILL_TIMEOUT
+        while True:
+            order_status = await asyncio.to_thread(self.client.get_order_status, order_id)
+            if order_status.get('status') == 'FILLED' or time.monotonic() >= deadline:
+                return order_status
+            await asyncio.sleep(ORDER_FILL_POLL_INTERVAL)
 
-        position = self.open_positions[ticker]
+    async def _check_exit_conditions(self, ticker: str, current_candle: Candle, position: dict):
+        """Check if position (the caller's open_positions entry for ticker) should be exited"""
+
+        # Pull the fields the checks need into locals once
         entry_time = position['entry_time']
-        current_time = current_candle.get('timestamp', datetime.now())
+        target_price = position['target_price']
+        stop_price = position['stop_price']
+        current_time = current_candle.timestamp
 
-        # Calculate hold time
-        minutes_held = (current_time - entry_time).total_seconds() / 60
+        # Hold time stays a timedelta for the per-candle timeout compare; it's only
+        # converted to minutes if the position actually exits
+        held = current_time - entry_time
 
         exit_price = None
         exit_reason = None
 
         # Check if target hit (using candle high)
-        if current_candle['high'] >= position['target_price']:
-            exit_price = position['target_price']
+        if current_candle.high >= target_price:
+            exit_price = target_price
             exit_reason = 'target_hit'
 
         # Check if emergency stop hit (using candle low)
-        elif current_candle['low'] <= position['stop_price']:
-            exit_price = position['stop_price']
+        elif current_candle.low <= stop_price:
+            exit_price = stop_price
             exit_reason = 'stop_loss'
 
         # Check if max hold time reached
-        elif minutes_held >= MAX_HOLD_MINUTES:
-            exit_price = current_candle['close']
+        elif held >= MAX_HOLD_TIME:
+            exit_price = current_candle.close
             exit_reason = 'timeout'
 
         if exit_price and exit_reason:
+            minutes_held = held.total_seconds() / 60
             await self._execute_exit(ticker, exit_price, exit_reason, minutes_held, current_time)
 
     async def _execute_exit(self, ticker: str, exit_price: float, exit_reason: str,
@@ -644,8 +705,8 @@ class ProvenDumpTrader:
         position = self.open_positions[ticker]
 
         # Apply exit fee
-        exit_with_fee = exit_price * (1 - EXIT_FEE)
-        entry_with_fee = position['entry_price'] * (1 + ENTRY_FEE)
+        exit_with_fee = exit_price * EXIT_FEE_MULT
+        entry_with_fee = position['entry_price'] * ENTRY_FEE_MULT
 
         # Calculate P&L
         gross_pnl_pct = ((exit_price - position['entry_price']) / position['entry_price']) * 100
@@ -685,6 +746,7 @@ class ProvenDumpTrader:
 
         # Remove from open positions
         del self.open_positions[ticker]
+        self.state_version += 1
 
         # Log stats every 5 trades
         stats = self.db.get_stats()
@@ -692,21 +754,24 @@ class ProvenDumpTrader:
             self._log_stats(stats)
 
     def _log_stats(self, stats: dict):
-        """Log current trading statistics"""
-        logger.info("")
-        logger.info("=" * 80)
-        logger.info("📊 TRADING STATISTICS")
-        logger.info("=" * 80)
-        logger.info(f"   Total Trades: {stats['total_trades']}")
-        logger.info(f"   Winners: {stats['winners']} | Losers: {stats['losers']}")
-        logger.info(f"   Win Rate: {stats['win_rate']:.1f}% (expected: {stats['expected_win_rate']}%)")
-        logger.info(f"   Total P&L: ${stats['total_pnl_usd']:+,.2f}")
-        logger.info(f"   Avg P&L per Trade: ${stats['avg_pnl_usd']:+.2f}")
-        logger.info(f"   Current Capital: ${stats['current_capital']:,.2f}")
-        logger.info(f"   Total Return: {stats['return_pct']:+.2f}% (expected: {stats['expected_return']}% per 3 days)")
-        logger.info(f"   Open Positions: {stats['open_positions']}/{MAX_CONCURRENT_POSITIONS}")
-        logger.info("=" * 80)
-        logger.info("")
+        """Log current trading statistics (as a single record - one handler write, not 14)"""
+        lines = [
+            "",
+            "=" * 80,
+            "📊 TRADING STATISTICS",
+            "=" * 80,
+            f"   Total Trades: {stats['total_trades']}",
+            f"   Winners: {stats['winners']} | Losers: {stats['losers']}",
+            f"   Win Rate: {stats['win_rate']:.1f}% (expected: {stats['expected_win_rate']}%)",
+            f"   Total P&L: ${stats['total_pnl_usd']:+,.2f}",
+            f"   Avg P&L per Trade: ${stats['avg_pnl_usd']:+.2f}",
+            f"   Current Capital: ${stats['current_capital']:,.2f}",
+            f"   Total Return: {stats['return_pct']:+.2f}% (expected: {stats['expected_return']}% per 3 days)",
+            f"   Open Positions: {stats['open_positions']}/{MAX_CONCURRENT_POSITIONS}",
+            "=" * 80,
+            "",
+        ]
+        logger.info("\n".join(lines))
 
     def get_stats(self):
         """Get current stats (for API)"""